@@ -1,17 +1,22 @@
 """Chat handler for μ-MCP."""
 
+import asyncio
 import base64
 import logging
 import mimetypes
 import os
+import random
 import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Union
 
-import aiohttp
+import httpx
+import orjson
 
 from models import (
     get_allowed_models,
+    load_environment,
     resolve_model,
     get_short_name,
 )
@@ -20,23 +25,103 @@ from prompts import (
     get_response_wrapper,
     get_request_wrapper,
 )
+from response_cache import ResponseCache
 from storage import ConversationStorage
 
 logger = logging.getLogger(__name__)
 
+# Providers that need explicit cache_control breakpoints for prompt caching;
+# others (OpenAI, DeepSeek, ...) cache matching prefixes automatically
+CACHE_CONTROL_PROVIDERS = ("anthropic/", "google/")
+
+# Image read size; a multiple of 3 so chunks base64-encode without padding
+IMAGE_CHUNK_SIZE = 57 * 1024
+
+# Data URL prefixes for common image types
+DATA_URL_PREFIXES = {
+    mime_type: f"data:{mime_type};base64,".encode()
+    for mime_type in ("image/png", "image/jpeg", "image/webp", "image/gif")
+}
+
+# Token estimate from UTF-8 size: ~4 bytes per token for English and code,
+# and multi-byte scripts (e.g. CJK) are no longer undercounted as chars/4 did
+BYTES_PER_TOKEN = 4
+
+# Rate limit and transient gateway statuses worth retrying
+RETRY_STATUSES = (429, 502, 503, 504)
+MAX_RETRY_DELAY = 30.0
+
+
+@lru_cache(maxsize=32)
+def _read_text_file(path: str, mtime_ns: int, size: int, byte_limit: int) -> tuple[str, int]:
+    """Read a text file and estimate its tokens.
+
+    Reads raw bytes, so the budget is measured on the bytes read and the
+    text is decoded exactly once. Memoized per file version (mtime and size
+    are part of the key), so files re-attached on later turns skip both the
+    read and the estimate.
+    """
+    with open(path, "rb") as f:
+        raw = f.read(byte_limit)
+    return raw.decode(errors="ignore"), len(raw) // BYTES_PER_TOKEN
+
 
 class ChatHandler:
     """Handle chat interactions with OpenRouter models."""
 
     def __init__(self):
+        load_environment()
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable not set")
         
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         
+        # Connection pool size for the shared HTTP client
+        self.pool_size = int(os.getenv("OPENROUTER_POOL_SIZE", "32"))
+        # Created on first API call; building its SSL context isn't free and
+        # handlers used only for storage (e.g. /continue) never need it
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Upstream concurrency limit and retry budget for rate-limited calls
+        self._semaphore = asyncio.Semaphore(int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "16")))
+        self.max_retries = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+        
         # Initialize persistent storage with default directory
         self.storage = ConversationStorage()
+        
+        # Optional cache of identical requests (off unless a TTL is configured)
+        self.response_cache = ResponseCache()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use."""
+        if self._client is None:
+            # One HTTP/2 client for all calls: concurrent requests multiplex
+            # over a pooled connection instead of each paying a TLS handshake
+            self._client = httpx.AsyncClient(
+                http2=True,
+                # Static headers are built once and sent on every request
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://github.com/mu-mcp",
+                    # httpx only accepts ASCII str headers; send the title as UTF-8 bytes
+                    "X-Title": "μ-MCP Server".encode(),
+                },
+                limits=httpx.Limits(
+                    max_keepalive_connections=self.pool_size,
+                    max_connections=self.pool_size * 2,
+                ),
+                timeout=httpx.Timeout(connect=10.0, read=None, write=30.0, pool=5.0),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Flush queued conversation saves, then close the shared HTTP client."""
+        await asyncio.to_thread(self.storage.close)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def chat(
         self,
@@ -88,11 +173,13 @@ class ChatHandler:
         
         # Get or create conversation
         messages_with_metadata = []
+        is_new = not continuation_id
         if continuation_id:
-            # Try to load from persistent storage
-            conversation_data = self.storage.load_conversation(continuation_id)
+            # Try to load from persistent storage (a disk read on cache miss, so off the event loop)
+            conversation_data = await asyncio.to_thread(self.storage.load_conversation, continuation_id)
             if conversation_data:
-                messages_with_metadata = conversation_data.get("messages", [])
+                # Copy: the cached conversation must not change until this turn is saved
+                messages_with_metadata = list(conversation_data.get("messages", []))
             else:
                 # Fail fast - conversation not found
                 return {
@@ -104,9 +191,8 @@ class ChatHandler:
             # New conversation with title provided
             continuation_id = str(uuid.uuid4())
 
-        # Build the user message with metadata and request wrapper
-        wrapped_prompt = prompt + get_request_wrapper()
-        user_content = self._build_user_content(wrapped_prompt, files, images)
+        # Build the user message with metadata
+        user_content = await self._build_user_content(prompt, files, images)
         user_message = self.storage.add_metadata_to_message(
             {"role": "user", "content": user_content},
             {"target_model": resolved_model}
@@ -116,14 +202,27 @@ class ChatHandler:
         # Get clean messages for API (without metadata)
         api_messages = self.storage.get_messages_for_api(messages_with_metadata)
         
-        # Add system prompt for the LLM
-        system_prompt = get_llm_system_prompt(resolved_model)
-        api_messages.insert(0, {"role": "system", "content": system_prompt})
+        # Static prefix first so provider-side prompt caching can reuse it:
+        # system prompt, then the request wrapper, then the conversation
+        api_messages[:0] = [
+            {"role": "system", "content": get_llm_system_prompt(resolved_model)},
+            {"role": "system", "content": get_request_wrapper()},
+        ]
+        if resolved_model.startswith(CACHE_CONTROL_PROVIDERS):
+            # Breakpoint on the newest message caches the whole prefix for the next turn
+            api_messages[-1] = self._with_cache_breakpoint(api_messages[-1])
 
-        # Make API call
-        response_text = await self._call_openrouter(
-            api_messages, resolved_model, reasoning_effort
-        )
+        # Make API call, unless an identical request was answered recently
+        response_text = None
+        if self.response_cache.enabled:
+            cache_key = self.response_cache.make_key(resolved_model, api_messages, reasoning_effort)
+            response_text = self.response_cache.get(cache_key)
+        if response_text is None:
+            response_text = await self._call_openrouter(
+                api_messages, resolved_model, reasoning_effort
+            )
+            if self.response_cache.enabled:
+                self.response_cache.set(cache_key, response_text)
 
         # Add assistant response with metadata
         assistant_message = self.storage.add_metadata_to_message(
@@ -132,13 +231,14 @@ class ChatHandler:
         )
         messages_with_metadata.append(assistant_message)
         
-        # Save conversation to persistent storage
+        # Save conversation to persistent storage (the disk write happens in the background)
         # Pass title only for new conversations (when title was provided)
         self.storage.save_conversation(
             continuation_id,
             messages_with_metadata,
             {"models_used": [resolved_model]},
-            title=title  # Will be None for continuations, actual title for new conversations
+            title,  # Will be None for continuations, actual title for new conversations
+            is_new=is_new,  # Fresh UUID: skip looking for an existing file
         )
         
         # Get short name for agent interface
@@ -155,73 +255,102 @@ class ChatHandler:
             "model_used": display_name,
         }
 
-    def _build_user_content(
+    def _with_cache_breakpoint(self, message: dict) -> dict:
+        """Return a copy of message with a cache_control marker on its last text part."""
+        content = message["content"]
+        if isinstance(content, str):
+            parts = [{"type": "text", "text": content}]
+        else:
+            parts = list(content)
+
+        for i in range(len(parts) - 1, -1, -1):
+            if parts[i].get("type") == "text":
+                parts[i] = {**parts[i], "cache_control": {"type": "ephemeral"}}
+                break
+
+        return {**message, "content": parts}
+
+    async def _build_user_content(
         self, prompt: str, files: Optional[list[str]], images: Optional[list[str]]
-    ) -> str | list:
+    ) -> list:
         """Build user message content with files and images."""
-        content_parts = []
-
         # Add main prompt
-        content_parts.append({"type": "text", "text": prompt})
+        content_parts = [{"type": "text", "text": prompt}]
 
         # Add files as text
         if files:
-            file_content = self._read_files(files)
+            file_content = await self._read_files(files)
             if file_content:
                 content_parts.append({"type": "text", "text": f"\n\nFiles:\n{file_content}"})
 
-        # Add images as base64 with proper MIME type
+        # Add images as base64 with proper MIME type, encoded concurrently off the event loop
         if images:
-            for image_path in images:
-                result = self._encode_image(image_path)
-                if result:
-                    encoded_data, mime_type = result
+            data_urls = await asyncio.gather(
+                *(asyncio.to_thread(self._encode_image, image_path) for image_path in images)
+            )
+            for data_url in data_urls:
+                if data_url:
                     content_parts.append(
                         {
                             "type": "image_url",
-                            "image_url": {"url": f"data:{mime_type};base64,{encoded_data}"},
+                            "image_url": {"url": data_url},
                         }
                     )
 
-        # If only text, return string; otherwise return multi-part content
-        if len(content_parts) == 1:
-            return prompt
+        # Always multi-part, even for text-only prompts, so callers see one shape
         return content_parts
 
-    def _read_files(self, file_paths: list[str]) -> str:
+    async def _read_files(self, file_paths: list[str]) -> str:
         """Read and combine file contents with token-based budgeting."""
         contents = []
-        # Simple token estimation: ~4 chars per token
+        # Token estimation from UTF-8 size: ~4 bytes per token
         # Reserve tokens for prompt and response
-        max_file_tokens = 50_000  # ~200k chars
+        max_file_tokens = 50_000  # ~200KB
         total_tokens = 0
 
-        for file_path in file_paths:
-            try:
-                path = Path(file_path)
-                if path.exists() and path.is_file():
-                    content = path.read_text(errors="ignore")
-                    # Estimate tokens
-                    file_tokens = len(content) // 4
-                    
-                    if total_tokens + file_tokens > max_file_tokens:
-                        # Truncate if needed
-                        remaining_tokens = max_file_tokens - total_tokens
-                        if remaining_tokens > 100:  # Worth including partial
-                            char_limit = remaining_tokens * 4
-                            content = content[:char_limit] + "\n[File truncated]"
-                            contents.append(f"\n--- {file_path} ---\n{content}")
-                        break
-                    
-                    contents.append(f"\n--- {file_path} ---\n{content}")
-                    total_tokens += file_tokens
-            except Exception as e:
-                logger.warning(f"Could not read file {file_path}: {e}")
+        # Read all files concurrently off the event loop. No file can use
+        # more than the whole budget, so stop reading just past it.
+        read_limit = (max_file_tokens + 1) * BYTES_PER_TOKEN
+        file_results = await asyncio.gather(
+            *(asyncio.to_thread(self._read_file, file_path, read_limit) for file_path in file_paths)
+        )
+
+        for file_path, result in zip(file_paths, file_results):
+            if result is None:
+                continue
+            content, file_tokens = result
+            
+            if total_tokens + file_tokens > max_file_tokens:
+                # Truncate if needed
+                remaining_tokens = max_file_tokens - total_tokens
+                if remaining_tokens > 100:  # Worth including partial
+                    byte_limit = remaining_tokens * BYTES_PER_TOKEN
+                    content = content.encode()[:byte_limit].decode(errors="ignore")
+                    contents.extend(("\n--- ", file_path, " ---\n", content, "\n[File truncated]"))
+                break
+            
+            # Header and body as separate pieces so content is copied only by the final join
+            contents.extend(("\n--- ", file_path, " ---\n", content))
+            total_tokens += file_tokens
 
         return "".join(contents)
 
-    def _encode_image(self, image_path: str) -> Optional[tuple[str, str]]:
-        """Encode image to base64 with proper MIME type."""
+    def _read_file(self, file_path: str, byte_limit: int) -> Optional[tuple[str, int]]:
+        """Read up to byte_limit bytes of a text file with its token estimate.
+
+        Returns None if the file is missing or unreadable.
+        """
+        try:
+            path = Path(file_path)
+            if path.exists() and path.is_file():
+                stat = path.stat()
+                return _read_text_file(str(path), stat.st_mtime_ns, stat.st_size, byte_limit)
+        except Exception as e:
+            logger.warning(f"Could not read file {file_path}: {e}")
+        return None
+
+    def _encode_image(self, image_path: str) -> Optional[str]:
+        """Encode image as a base64 data URL with proper MIME type."""
         try:
             path = Path(image_path)
             if path.exists() and path.is_file():
@@ -231,9 +360,14 @@ class ChatHandler:
                     # Default to JPEG for unknown types
                     mime_type = 'image/jpeg'
                 
-                with open(path, "rb") as f:
-                    encoded = base64.b64encode(f.read()).decode("utf-8")
-                    return encoded, mime_type
+                # Write the data URL prefix, then encode chunk by chunk, so the
+                # raw file is never held in full and the URL is decoded once
+                prefix = DATA_URL_PREFIXES.get(mime_type) or f"data:{mime_type};base64,".encode()
+                data_url = bytearray(prefix)
+                with open(path, "rb", buffering=1 << 20) as f:
+                    while chunk := f.read(IMAGE_CHUNK_SIZE):
+                        data_url += base64.b64encode(chunk)
+                return data_url.decode("ascii")
         except Exception as e:
             logger.warning(f"Could not encode image {image_path}: {e}")
         return None
@@ -245,16 +379,11 @@ class ChatHandler:
         reasoning_effort: Optional[str],
     ) -> str:
         """Make API call to OpenRouter."""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/mu-mcp",
-            "X-Title": "μ-MCP Server",
-        }
-
         data = {
             "model": model,
             "messages": messages,
+            # Stream deltas so long completions aren't buffered in one piece
+            "stream": True,
         }
 
         # Add reasoning effort if specified
@@ -264,11 +393,58 @@ class ChatHandler:
                 "effort": reasoning_effort  # "low", "medium", or "high"
             }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.base_url, headers=headers, json=data) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"OpenRouter API error: {response.status} - {error_text}")
+        body = orjson.dumps(data)
+        
+        # Bound concurrent upstream calls, and back off on rate limits and
+        # transient gateway errors instead of failing the tool call
+        client = self._get_client()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                async with client.stream("POST", self.base_url, content=body) as response:
+                    if response.status_code == 200:
+                        return await self._read_stream(response)
+
+                    error_text = (await response.aread()).decode(errors="replace")
+                    if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                        raise Exception(f"OpenRouter API error: {response.status_code} - {error_text}")
+                    delay = self._retry_delay(response, attempt)
+
+                logger.warning(
+                    f"OpenRouter returned {response.status_code}, retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying, honoring Retry-After when present."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_DELAY)
+            except ValueError:
+                pass  # HTTP-date form; fall back to exponential backoff
+        return min(MAX_RETRY_DELAY, 2 ** attempt) + random.random()
+
+    async def _read_stream(self, response: httpx.Response) -> str:
+        """Concatenate content deltas from an OpenRouter SSE stream."""
+        parts = []
+        async for line in response.aiter_lines():
+            # Skip blank separators and SSE comments (keep-alive pings)
+            if not line.startswith("data: "):
+                continue
+            payload = line[len("data: "):]
+            if payload == "[DONE]":
+                break
+
+            chunk = orjson.loads(payload)
+            # Errors after the stream has started arrive as a data event
+            if "error" in chunk:
+                error = chunk["error"]
+                raise Exception(f"OpenRouter API error: {error.get('code')} - {error.get('message')}")
+
+            for choice in chunk.get("choices", []):
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    parts.append(content)
 
-                result = await response.json()
-                return result["choices"][0]["message"]["content"]
+        return "".join(parts)
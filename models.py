@@ -1,12 +1,11 @@
 """OpenRouter model registry and capabilities."""
 
 import os
+import sys
 from dataclasses import dataclass
-from typing import Optional
-
-# Load environment variables from .env file
-from dotenv import load_dotenv
-load_dotenv()
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 
 @dataclass
@@ -105,13 +104,36 @@ OPENROUTER_MODELS = {
 }
 
 
-def get_allowed_models() -> dict[str, ModelCapabilities]:
-    """Get models filtered by OPENROUTER_ALLOWED_MODELS env var."""
-    allowed = os.getenv("OPENROUTER_ALLOWED_MODELS", "")
-    
+# Lookup tables so name resolution is a dict probe instead of a registry scan
+# Keys are interned so exact-name probes usually match by identity
+_BY_KEY = {sys.intern(key.lower()): model.name for key, model in OPENROUTER_MODELS.items()}
+_BY_SUFFIX = {model.name.split("/")[-1].lower(): model.name for model in OPENROUTER_MODELS.values()}
+_BY_FULL_NAME = {model.name: key for key, model in OPENROUTER_MODELS.items()}
+
+
+@lru_cache(maxsize=1)
+def load_environment():
+    """Load environment variables from the .env file, once, on first use."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def get_allowed_models() -> Mapping[str, ModelCapabilities]:
+    """Get models filtered by OPENROUTER_ALLOWED_MODELS env var.
+
+    The result is shared between callers, so it is read-only.
+    """
+    load_environment()
+    return _filter_models(os.getenv("OPENROUTER_ALLOWED_MODELS", ""))
+
+
+@lru_cache(maxsize=1)
+def _filter_models(allowed: str) -> Mapping[str, ModelCapabilities]:
+    """Filter the registry by an allowed-models string, memoized per value."""
     if not allowed:
         # No restrictions, return all models
-        return OPENROUTER_MODELS
+        return MappingProxyType(OPENROUTER_MODELS)
     
     # Parse comma-separated list
     allowed_names = [name.strip().lower() for name in allowed.split(",")]
@@ -127,7 +149,7 @@ def get_allowed_models() -> dict[str, ModelCapabilities]:
         if model.name.split("/")[-1].lower() in allowed_names:
             filtered[key] = model
     
-    return filtered
+    return MappingProxyType(filtered)
 
 
 def resolve_model(name: str) -> Optional[str]:
@@ -135,23 +157,21 @@ def resolve_model(name: str) -> Optional[str]:
     if not name:
         return None
         
-    name_lower = name.lower()
-    
-    # Check if it's already a full path
-    if "/" in name:
-        return name
+    # Fast path: agents usually pass the canonical short name as-is
+    full_name = _BY_KEY.get(name)
     
-    # Check available models
-    models = get_allowed_models()
-    
-    # Direct key match
-    if name_lower in models:
-        return models[name_lower].name
+    if not full_name:
+        # Check if it's already a full path
+        if "/" in name:
+            return name
+        
+        # Case-insensitive key match, then match by model name suffix
+        name_lower = name.lower()
+        full_name = _BY_KEY.get(name_lower) or _BY_SUFFIX.get(name_lower)
     
-    # Check by model name suffix
-    for key, model in models.items():
-        if model.name.endswith(f"/{name_lower}"):
-            return model.name
+    # Only resolve models that are currently allowed
+    if full_name and _BY_FULL_NAME[full_name] in get_allowed_models():
+        return full_name
     
     return None
 
@@ -168,12 +188,9 @@ def get_short_name(full_name: str) -> Optional[str]:
     if not full_name:
         return None
     
-    # Check available models for matching full name
-    models = get_allowed_models()
-    
-    for key, model in models.items():
-        if model.name == full_name:
-            return key
+    key = _BY_FULL_NAME.get(full_name)
+    if key and key in get_allowed_models():
+        return key
     
     # If not found in registry, return None
     # This handles cases where a custom full path was used
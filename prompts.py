@@ -1,12 +1,11 @@
 """System prompts for μ-MCP."""
 
+from functools import lru_cache
+from typing import Final
 
-def get_llm_system_prompt(model_name: str = None) -> str:
-    """
-    System prompt for the LLM being called.
-    Modern, direct, without childish "you are" patterns.
-    """
-    return """Collaborate as a technical peer with Claude, the AI agent requesting assistance.
+
+# Prompt text is static, so build it once at import
+_LLM_SYSTEM_PROMPT: Final[str] = """Collaborate as a technical peer with Claude, the AI agent requesting assistance.
 
 Core principles:
 - Provide expert analysis and alternative perspectives
@@ -22,27 +21,50 @@ Format code with proper syntax highlighting.
 Maintain technical precision over conversational comfort.
 Skip unnecessary preambles - dive directly into substance."""
 
+# Sent as its own system message so the prompt prefix stays byte-identical
+_REQUEST_WRAPPER: Final[str] = """REQUEST FROM CLAUDE: The queries in this conversation come from Claude, an AI assistant seeking peer collaboration."""
 
-def get_request_wrapper() -> str:
+_AGENT_TOOL_DESCRIPTION: Final[str] = """Direct access to state-of-the-art AI models via OpenRouter.
+
+Provide EXACTLY ONE:
+- title: Start fresh (when switching topics, context too long, or isolating model contexts)
+- continuation_id: Continue existing conversation (preserves full context)
+
+When starting fresh: Model has no context - include background details or attach files
+When continuing: Model has conversation history - don't repeat context
+
+FILE ATTACHMENT BEST PRACTICES:
+- Proactively attach relevant files when starting new conversations for context
+- For long content (git diffs, logs, terminal output), save to a file and attach it rather than pasting verbatim in prompt
+- Files are processed more efficiently and precisely than inline text"""
+
+
+def get_llm_system_prompt(model_name: str = None) -> str:
     """
-    Wrapper text to inform the peer AI that this request is from Claude.
+    System prompt for the LLM being called.
+    Modern, direct, without childish "you are" patterns.
     """
-    return """
+    return _LLM_SYSTEM_PROMPT
 
----
 
-REQUEST FROM CLAUDE: The following query comes from Claude, an AI assistant seeking peer collaboration."""
+def get_request_wrapper() -> str:
+    """
+    Wrapper text to inform the peer AI that this request is from Claude.
+    """
+    return _REQUEST_WRAPPER
 
 
+@lru_cache(maxsize=64)
 def get_response_wrapper(model_name: str) -> str:
     """
     Wrapper text for Claude to understand this is another AI's perspective.
     
     Args:
-        model_name: Short model name (e.g., "gpt-5", "sonnet")
+        model_name: Short model name (e.g., "gpt-5") or full path for
+            models outside the registry (e.g., "openai/gpt-5")
     """
-    # Format short name for display (e.g., "gpt-5" -> "GPT 5")
-    display_name = model_name.upper().replace("-", " ")
+    # Format for display without the provider prefix (e.g., "gpt-5" -> "GPT 5")
+    display_name = model_name.split("/")[-1].upper().replace("-", " ")
     return f"""
 
 ---
@@ -54,16 +76,4 @@ def get_agent_tool_description() -> str:
     """
     Description for the calling agent (Claude) about how to use this tool.
     """
-    return """Direct access to state-of-the-art AI models via OpenRouter.
-
-Provide EXACTLY ONE:
-- title: Start fresh (when switching topics, context too long, or isolating model contexts)
-- continuation_id: Continue existing conversation (preserves full context)
-
-When starting fresh: Model has no context - include background details or attach files
-When continuing: Model has conversation history - don't repeat context
-
-FILE ATTACHMENT BEST PRACTICES:
-- Proactively attach relevant files when starting new conversations for context
-- For long content (git diffs, logs, terminal output), save to a file and attach it rather than pasting verbatim in prompt
-- Files are processed more efficiently and precisely than inline text"""
\ No newline at end of file
+    return _AGENT_TOOL_DESCRIPTION
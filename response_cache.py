@@ -0,0 +1,72 @@
+"""In-memory cache of model responses for μ-MCP."""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Exact-match cache of completions keyed by model, messages and effort.
+
+    Disabled unless MU_MCP_RESPONSE_CACHE_TTL is set to a positive number
+    of seconds, since asking the same question twice is sometimes the point.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 128):
+        """Initialize the cache, reading the TTL from the environment by default."""
+        if ttl is None:
+            ttl = float(os.getenv("MU_MCP_RESPONSE_CACHE_TTL", "0"))
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # key -> (expires_at, response_text), oldest first
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether responses are cached at all."""
+        return self.ttl > 0
+
+    def make_key(self, model: str, messages: list, reasoning_effort: Optional[str]) -> str:
+        """Build a stable cache key for a request."""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "effort": reasoning_effort},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            The cached response text or None on a miss or expired entry
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response_text = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        logger.debug(f"Response cache hit for {key[:12]}")
+        return response_text
+
+    def set(self, key: str, response_text: str):
+        """Store a response, evicting the least recently used entry if full."""
+        self._entries[key] = (time.monotonic() + self.ttl, response_text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -6,20 +6,19 @@ In contrast to zen-mcp's 10,000+ lines of orchestration,
 """
 
 import asyncio
-import json
 import logging
 import os
 import sys
-from typing import Any
+from datetime import datetime
+from typing import Any, Awaitable, Callable
 
-# Load environment variables from .env file
-from dotenv import load_dotenv
-load_dotenv()
-
-from mcp import McpError, types
+import orjson
+from mcp import McpError
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
 from mcp.types import (
+    INVALID_PARAMS,
+    ErrorData,
     TextContent,
     Tool,
     ServerCapabilities,
@@ -30,9 +29,19 @@ from mcp.types import (
     PromptsCapability,
 )
 
-from models import get_allowed_models
+try:
+    # Optional faster event loop (pip install mu-mcp[speedups]); not available on Windows
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from chat_handler import ChatHandler
+from models import get_allowed_models, load_environment
 from prompts import get_agent_tool_description
 
+# Load environment variables from .env file before reading LOG_LEVEL
+load_environment()
+
 # Configure logging
 log_level = os.getenv("LOG_LEVEL", "INFO")
 logging.basicConfig(
@@ -43,194 +52,144 @@ logger = logging.getLogger(__name__)
 
 app = Server("μ-mcp")
 
+# Shared chat handler so HTTP connections and the conversation cache
+# are reused across tool calls and prompts
+_handler: ChatHandler | None = None
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available tools - just one: chat."""
-    # Build model enum for schema
-    models = get_allowed_models()
-    
-    # Build model enum for schema
-    model_enum = []
-    model_descriptions = []
-    
-    for key, model in models.items():
-        # Use short name (key) in enum
-        model_enum.append(key)
-        # Show only short name in description, not full path
-        model_descriptions.append(f"• {key}: {model.description}")
-    
-    # Build the combined description
-    models_description = "Select the AI model that best fits your task:\n\n" + "\n".join(model_descriptions)
-    
+
+def _get_handler() -> ChatHandler:
+    """Get the shared ChatHandler, creating it on first use."""
+    global _handler
+    if _handler is None:
+        _handler = ChatHandler()
+    return _handler
+
+
+# Model choices for the chat tool schema, fixed for the life of the process.
+# Use short name (key) in enum, and show only short name in description, not full path
+_MODEL_ENUM = list(get_allowed_models())
+_MODELS_DESCRIPTION = "Select the AI model that best fits your task:\n\n" + "\n".join(
+    [f"• {key}: {model.description}" for key, model in get_allowed_models().items()]
+)
+
+
+# JSON schema for the chat tool arguments
+_CHAT_INPUT_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "prompt": {
+            "type": "string",
+            "description": "Your message or question"
+        },
+        "model": {
+            "type": "string",
+            "enum": _MODEL_ENUM,
+            "description": _MODELS_DESCRIPTION,
+        },
+        "title": {
+            "type": "string",
+            "description": "Title for new conversation (3-10 words). Provide this OR continuation_id, not both",
+        },
+        "continuation_id": {
+            "type": "string",
+            "description": "UUID to continue existing conversation. Provide this OR title, not both",
+        },
+        "files": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Absolute paths to files to include as context",
+        },
+        "images": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Absolute paths to images to include",
+        },
+        "reasoning_effort": {
+            "type": "string",
+            "enum": ["low", "medium", "high"],
+            "description": "Reasoning depth for models that support it (low=20%, medium=50%, high=80% of computation)",
+            "default": "medium",
+        },
+    },
+    "required": ["prompt", "model"],  # Model is now required
+}
+
+
+def _build_tools() -> list[Tool]:
+    """Build the tool list - just one: chat."""
     return [
         Tool(
             name="chat",
             description=get_agent_tool_description(),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "prompt": {
-                        "type": "string",
-                        "description": "Your message or question"
-                    },
-                    "model": {
-                        "type": "string",
-                        "enum": model_enum,
-                        "description": models_description,
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "Title for new conversation (3-10 words). Provide this OR continuation_id, not both",
-                    },
-                    "continuation_id": {
-                        "type": "string",
-                        "description": "UUID to continue existing conversation. Provide this OR title, not both",
-                    },
-                    "files": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Absolute paths to files to include as context",
-                    },
-                    "images": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Absolute paths to images to include",
-                    },
-                    "reasoning_effort": {
-                        "type": "string",
-                        "enum": ["low", "medium", "high"],
-                        "description": "Reasoning depth for models that support it (low=20%, medium=50%, high=80% of computation)",
-                        "default": "medium",
-                    },
-                },
-                "required": ["prompt", "model"],  # Model is now required
-            },
+            inputSchema=_CHAT_INPUT_SCHEMA,
         )
     ]
 
 
-@app.list_prompts()
-async def list_prompts() -> list[Prompt]:
-    """List available prompts for slash commands."""
-    return [
-        Prompt(
-            name="chat",
-            description="Start a chat with AI models",
-            arguments=[],
-        ),
-        Prompt(
-            name="continue",
-            description="Continue the previous conversation",
-            arguments=[],
-        ),
-        Prompt(
-            name="challenge",
-            description="Encourage critical thinking and avoid reflexive agreement",
-            arguments=[],
-        ),
-        Prompt(
-            name="discuss",
-            description="Orchestrate multi-turn discussion among multiple AIs",
-            arguments=[],
-        ),
-    ]
+# The model registry is fixed for the life of the process, so build the tools once;
+# frozen as a tuple since every call shares it
+_TOOLS = tuple(_build_tools())
 
 
-@app.get_prompt()
-async def get_prompt(name: str, arguments: dict[str, Any] = None) -> GetPromptResult:
-    """Generate prompt text for slash commands."""
-    if name == "chat":
-        return GetPromptResult(
-            description="Start a chat with AI models",
-            messages=[
-                PromptMessage(
-                    role="user",
-                    content=TextContent(
-                        type="text",
-                        text="Use the chat tool to interact with an AI model."
-                    )
-                )
-            ],
-        )
-    elif name == "continue":
-        # Get the list of recent conversations
-        from chat_handler import ChatHandler
-        from datetime import datetime
-        
-        handler = ChatHandler()
-        recent_conversations = handler.storage.list_recent_conversations(20)
-        
-        if recent_conversations:
-            # Format the conversation list
-            conv_list = []
-            for i, conv in enumerate(recent_conversations, 1):
-                # Calculate relative time
-                if conv.get("updated"):
-                    try:
-                        updated_time = datetime.fromisoformat(conv["updated"])
-                        now = datetime.utcnow()
-                        time_diff = now - updated_time
-                        
-                        # Format relative time
-                        if time_diff.days > 0:
-                            time_str = f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-                        elif time_diff.seconds >= 3600:
-                            hours = time_diff.seconds // 3600
-                            time_str = f"{hours} hour{'s' if hours > 1 else ''} ago"
-                        elif time_diff.seconds >= 60:
-                            minutes = time_diff.seconds // 60
-                            time_str = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-                        else:
-                            time_str = "just now"
-                    except:
-                        time_str = "unknown time"
-                else:
-                    time_str = "unknown time"
-                
-                # Get display text (title should always exist)
-                display = conv.get("title", "[Untitled]")
-                # model_used is already a short name from list_recent_conversations()
-                model = conv.get("model_used", "unknown model")
-                
-                conv_list.append(
-                    f"{i}. [{time_str}] {display}\n"
-                    f"   Model: {model} | ID: {conv['id']}"
-                )
-            
-            instruction_text = f"""Select a conversation to continue using the chat tool.
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available tools - just one: chat."""
+    return list(_TOOLS)
 
-Recent Conversations (newest first):
-{chr(10).join(conv_list)}
 
-To continue a conversation, use the chat tool with the desired continuation_id.
-Example: Use continuation_id: "{recent_conversations[0]['id']}" for the most recent conversation.
+# Prompt listing is static, so build it once
+_PROMPTS = [
+    Prompt(
+        name="chat",
+        description="Start a chat with AI models",
+        arguments=[],
+    ),
+    Prompt(
+        name="continue",
+        description="Continue the previous conversation",
+        arguments=[],
+    ),
+    Prompt(
+        name="challenge",
+        description="Encourage critical thinking and avoid reflexive agreement",
+        arguments=[],
+    ),
+    Prompt(
+        name="discuss",
+        description="Orchestrate multi-turn discussion among multiple AIs",
+        arguments=[],
+    ),
+]
 
-This allows you to access the full conversation history even if your context was compacted."""
-        else:
-            instruction_text = "No previous conversations found. Start a new conversation using the chat tool."
-        
-        return GetPromptResult(
-            description="Continue a previous conversation",
-            messages=[
-                PromptMessage(
-                    role="user",
-                    content=TextContent(
-                        type="text",
-                        text=instruction_text
-                    )
+
+@app.list_prompts()
+async def list_prompts() -> list[Prompt]:
+    """List available prompts for slash commands."""
+    return _PROMPTS
+
+
+# Slash commands whose text never changes, built once
+_STATIC_PROMPTS: dict[str, GetPromptResult] = {
+    "chat": GetPromptResult(
+        description="Start a chat with AI models",
+        messages=[
+            PromptMessage(
+                role="user",
+                content=TextContent(
+                    type="text",
+                    text="Use the chat tool to interact with an AI model."
                 )
-            ],
-        )
-    elif name == "challenge":
-        return GetPromptResult(
-            description="Encourage critical thinking and avoid reflexive agreement",
-            messages=[
-                PromptMessage(
-                    role="user",
-                    content=TextContent(
-                        type="text",
-                        text="""CRITICAL REASSESSMENT MODE:
+            )
+        ],
+    ),
+    "challenge": GetPromptResult(
+        description="Encourage critical thinking and avoid reflexive agreement",
+        messages=[
+            PromptMessage(
+                role="user",
+                content=TextContent(
+                    type="text",
+                    text="""CRITICAL REASSESSMENT MODE:
 
 When using the chat tool, wrap your prompt with instructions for the AI to:
 - Challenge ideas and think critically before responding
@@ -239,19 +198,18 @@ When using the chat tool, wrap your prompt with instructions for the AI to:
 
 Example: Instead of accepting a statement, ask the AI to examine it for accuracy, completeness, and reasoning flaws.
 This promotes truth-seeking over compliance."""
-                    )
                 )
-            ],
-        )
-    elif name == "discuss":
-        return GetPromptResult(
-            description="Orchestrate multi-turn discussion among multiple AIs",
-            messages=[
-                PromptMessage(
-                    role="user",
-                    content=TextContent(
-                        type="text",
-                        text="""MULTI-AI DISCUSSION MODE:
+            )
+        ],
+    ),
+    "discuss": GetPromptResult(
+        description="Orchestrate multi-turn discussion among multiple AIs",
+        messages=[
+            PromptMessage(
+                role="user",
+                content=TextContent(
+                    type="text",
+                    text="""MULTI-AI DISCUSSION MODE:
 
 Use the chat tool to orchestrate a multi-turn discussion among diverse AI models.
 
@@ -265,29 +223,169 @@ Requirements:
 
 Do NOT stop after one round. Keep the discussion going through multiple exchanges until reaching a natural conclusion.
 Synthesize findings, highlighting both agreements and valuable disagreements."""
-                    )
                 )
-            ],
+            )
+        ],
+    ),
+}
+
+
+# Units for relative times, largest first
+_TIME_UNITS = ((86400, "day"), (3600, "hour"), (60, "minute"))
+
+
+def _format_relative_time(seconds: float) -> str:
+    """Format elapsed seconds as e.g. "3 hours ago"."""
+    for unit_seconds, unit in _TIME_UNITS:
+        if seconds >= unit_seconds:
+            count = int(seconds // unit_seconds)
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+    return "just now"
+
+
+def _conversation_age(updated: str | None, now: datetime) -> str:
+    """Relative time since a conversation's ISO "updated" timestamp."""
+    if not updated:
+        return "unknown time"
+    try:
+        elapsed = (now - datetime.fromisoformat(updated)).total_seconds()
+    except (ValueError, TypeError):
+        # Hand-edited or foreign files may carry a malformed, non-string or
+        # timezone-aware timestamp (which can't be subtracted from naive UTC)
+        return "unknown time"
+    return _format_relative_time(elapsed)
+
+
+async def _continue_prompt() -> GetPromptResult:
+    """List recent conversations so the agent can pick one to continue."""
+    handler = _get_handler()
+    # Listing waits for queued writes and reads the directory, so keep it off the event loop
+    recent_conversations = await asyncio.to_thread(handler.storage.list_recent_conversations, 20)
+
+    if recent_conversations:
+        # Format the conversation list, reading the clock once for the whole listing
+        # (model_used is already a short name from list_recent_conversations())
+        now = datetime.utcnow()
+        conv_list = "\n".join(
+            f"{i}. [{_conversation_age(conv.get('updated'), now)}] {conv.get('title', '[Untitled]')}\n"
+            f"   Model: {conv.get('model_used', 'unknown model')} | ID: {conv['id']}"
+            for i, conv in enumerate(recent_conversations, 1)
         )
+
+        instruction_text = f"""Select a conversation to continue using the chat tool.
+
+Recent Conversations (newest first):
+{conv_list}
+
+To continue a conversation, use the chat tool with the desired continuation_id.
+Example: Use continuation_id: "{recent_conversations[0]['id']}" for the most recent conversation.
+
+This allows you to access the full conversation history even if your context was compacted."""
     else:
+        instruction_text = "No previous conversations found. Start a new conversation using the chat tool."
+
+    return GetPromptResult(
+        description="Continue a previous conversation",
+        messages=[
+            PromptMessage(
+                role="user",
+                content=TextContent(
+                    type="text",
+                    text=instruction_text
+                )
+            )
+        ],
+    )
+
+
+# Slash commands whose text is generated per request
+_PROMPT_HANDLERS: dict[str, Callable[[], Awaitable[GetPromptResult]]] = {
+    "continue": _continue_prompt,
+}
+
+
+@app.get_prompt()
+async def get_prompt(name: str, arguments: dict[str, Any] = None) -> GetPromptResult:
+    """Generate prompt text for slash commands."""
+    static_prompt = _STATIC_PROMPTS.get(name)
+    if static_prompt is not None:
+        return static_prompt
+
+    prompt_handler = _PROMPT_HANDLERS.get(name)
+    if prompt_handler is None:
         raise ValueError(f"Unknown prompt: {name}")
+    return await prompt_handler()
+
+
+async def _handle_chat(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Run the chat tool on the shared handler."""
+    return await _get_handler().chat(**arguments)
+
+
+# Tool name -> coroutine taking the call arguments
+_TOOL_HANDLERS: dict[str, Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]] = {
+    "chat": _handle_chat,
+}
+
+
+# Opt-in: identical calls arriving together (e.g. client retries) share one upstream
+# request. Off by default, since asking the same question twice is often deliberate.
+_DEDUPE_INFLIGHT = os.getenv("MU_MCP_DEDUPE_INFLIGHT", "").lower() in ("1", "true", "yes")
+
+# Tool calls currently running, keyed by name and canonical arguments
+_inflight: dict[bytes, asyncio.Future] = {}
+
+
+def _can_share(arguments: dict[str, Any]) -> bool:
+    """Whether a call may join an identical one already in flight."""
+    # Calls that start a conversation (title, no continuation_id) must each get their own
+    return _DEDUPE_INFLIGHT and bool(arguments.get("continuation_id"))
+
+
+async def _run_shared(
+    name: str,
+    tool_handler: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]],
+    arguments: dict[str, Any],
+) -> dict[str, Any]:
+    """Run a tool call, joining an identical call already in flight."""
+    key = orjson.dumps([name, arguments], option=orjson.OPT_SORT_KEYS)
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(tool_handler(arguments))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.debug("Joining in-flight %s call", name)
+    # Shield so one caller going away doesn't cancel the call for the others
+    return await asyncio.shield(future)
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     """Handle tool calls - just chat."""
-    if name != "chat":
-        raise McpError(f"Unknown tool: {name}")
+    tool_handler = _TOOL_HANDLERS.get(name)
+    if tool_handler is None:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Unknown tool: {name}"))
 
-    from chat_handler import ChatHandler
+    # The payload is always a plain string, so skip pydantic validation
+    try:
+        if _can_share(arguments):
+            result = await _run_shared(name, tool_handler, arguments)
+        else:
+            result = await tool_handler(arguments)
+        return [TextContent.model_construct(type="text", text=orjson.dumps(result).decode())]
+    except Exception as e:
+        logger.error("Chat tool error: %s", e)
+        return [TextContent.model_construct(type="text", text=f"Error: {str(e)}")]
 
+
+async def _warm_up_handler():
+    """Create the shared handler ahead of the first request, if possible."""
     try:
-        handler = ChatHandler()
-        result = await handler.chat(**arguments)
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        await asyncio.to_thread(_get_handler)
     except Exception as e:
-        logger.error(f"Chat tool error: {e}")
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+        # Not fatal: _get_handler() retries on first use and reports the error per call
+        logger.warning("Could not initialize chat handler at startup: %s", e)
 
 
 async def main():
@@ -300,26 +398,54 @@ async def main():
 
     # Log configuration
     models = get_allowed_models()
-    logger.info(f"Starting μ-MCP Server...")
-    logger.info(f"Available models: {len(models)}")
-    
+    logger.info("Starting μ-MCP Server...")
+    logger.info("Available models: %d", len(models))
+
     # Use stdio transport
     from mcp.server.stdio import stdio_server
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="μ-mcp",
-                server_version="2.0.0",
-                capabilities=ServerCapabilities(
-                    tools=ToolsCapability(),
-                    prompts=PromptsCapability(),
+    # Build the shared handler (env config, storage directory) off the loop
+    # while the stdio transport comes up, so the first request doesn't pay for it
+    handler_task = asyncio.create_task(_warm_up_handler())
+
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await handler_task
+            await app.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="μ-mcp",
+                    server_version="2.0.0",
+                    capabilities=ServerCapabilities(
+                        tools=ToolsCapability(),
+                        prompts=PromptsCapability(),
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        if not handler_task.done():
+            handler_task.cancel()
+        await asyncio.gather(handler_task, return_exceptions=True)
+        if _handler is not None:
+            await _handler.aclose()
+
+
+def run():
+    """Entry point: run the server on a dedicated event loop (uvloop if installed)."""
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    # Long-lived server: never take the debug slow paths, even if PYTHONASYNCIODEBUG is set
+    loop.set_debug(False)
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(main())
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
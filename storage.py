@@ -1,16 +1,32 @@
 """Persistent conversation storage for μ-MCP."""
 
-import json
+import heapq
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import logging
 
+import orjson
+
 from models import get_short_name
 
 logger = logging.getLogger(__name__)
 
+# Listing sidecar written next to each <id>.json. Deliberately not *.json, so
+# builds that list conversations by globbing *.json don't mistake it for one.
+SUMMARY_SUFFIX = ".summary"
+
+
+@lru_cache(maxsize=256)
+def _model_display_name(full_name: str) -> str:
+    """Short name for the agent interface, or the full name if it has none."""
+    return get_short_name(full_name) or full_name
+
 
 class ConversationStorage:
     """Handles persistent storage of multi-model conversations."""
@@ -23,8 +39,33 @@ class ConversationStorage:
         # Create directory if it doesn't exist
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         
-        # In-memory cache for conversations (no limit within MCP lifecycle)
-        self._cache = {}
+        # Temp files for atomic writes live in a subdirectory, so creating them
+        # doesn't touch the storage directory's mtime (see _write_conversation)
+        self._tmp_dir = self.storage_dir / ".tmp"
+        self._tmp_dir.mkdir(exist_ok=True)
+        
+        # In-memory LRU cache of recently used conversations, oldest first
+        self._cache: OrderedDict[str, dict] = OrderedDict()
+        self._cache_size = int(os.getenv("MU_MCP_CACHE_SIZE", "256"))
+        
+        # Conversation id -> file mtime for listings, built on first use and kept
+        # current by our saves; rebuilt when another process changes the directory
+        self._index: Optional[dict[str, float]] = None
+        self._index_dir_mtime: Optional[int] = None
+        
+        # Guards the cache and index, which the writer thread also touches
+        self._lock = threading.Lock()
+        
+        # Disk writes run in order on one background thread, off the request path
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mu-mcp-storage")
+        
+        # Latest serialized (conversation, summary) per conversation waiting to be
+        # written; saves that arrive before the write starts just replace the payload
+        self._pending: dict[str, tuple[bytes, bytes]] = {}
+        
+        # Listing fields of conversations saved by this process, replaced (never
+        # mutated) on each save so listings don't touch the live cached data
+        self._summaries: dict[str, dict] = {}
         
         # Track last conversation for "continue" command
         self._last_conversation_id = None
@@ -33,37 +74,42 @@ class ConversationStorage:
         logger.info(f"Conversation storage initialized at: {self.storage_dir}")
     
     def save_conversation(self, conversation_id: str, messages: list, 
-                         model_metadata: Optional[dict] = None, title: Optional[str] = None) -> bool:
+                         model_metadata: Optional[dict] = None, title: Optional[str] = None,
+                         is_new: bool = False) -> bool:
         """
-        Save a conversation to disk and update cache.
+        Update the cache and queue the conversation to be written to disk.
         
         Args:
             conversation_id: Unique conversation identifier
             messages: List of message dicts with role and content
             model_metadata: Optional metadata about models used
             title: Optional conversation title
+            is_new: The conversation was just created, so there is nothing to merge from disk
         
         Returns:
-            True if saved successfully
+            True if the conversation was cached and queued for writing
         """
         try:
             file_path = self.storage_dir / f"{conversation_id}.json"
             
-            # Check if conversation exists to determine created time
-            existing = {}
-            if file_path.exists():
-                with open(file_path, "r") as f:
-                    existing = json.load(f)
-                    created = existing.get("created")
-            else:
-                created = datetime.utcnow().isoformat()
+            # Determine created time from the cached copy, falling back to disk
+            # only for existing conversations no longer in the cache
+            existing = self._cache.get(conversation_id)
+            if existing is None:
+                if is_new or not file_path.exists():
+                    existing = {}
+                else:
+                    existing = orjson.loads(file_path.read_bytes())
+            now = datetime.utcnow().isoformat()
+            created = existing.get("created") or now
             
-            # Prepare conversation data
+            # Prepare conversation data. The messages are copied so the queued write
+            # persists exactly this save, even if the caller's list grows later.
             conversation_data = {
                 "id": conversation_id,
                 "created": created,
-                "updated": datetime.utcnow().isoformat(),
-                "messages": messages,
+                "updated": now,
+                "messages": list(messages),
             }
             
             # Add title if provided or preserve existing title
@@ -76,36 +122,37 @@ class ConversationStorage:
             if model_metadata:
                 conversation_data["model_metadata"] = model_metadata
             
-            # Write to file
-            with open(file_path, "w") as f:
-                json.dump(conversation_data, f, indent=2)
+            # Also stored in the data so readers don't have to rescan the messages
+            last_full_name = self._extract_last_model(conversation_data)
             
-            # Update cache (write-through)
-            self._cache[conversation_id] = conversation_data
+            # Small sidecar with just the listing fields, so listings skip the messages
+            summary = {
+                "id": conversation_id,
+                "title": conversation_data.get("title"),
+                "created": created,
+                "updated": now,
+                "model": last_full_name,
+            }
+            
+            # Serialize now so the queued write is an immutable snapshot of this save
+            payload = (orjson.dumps(conversation_data), orjson.dumps(summary))
+            
+            # Update cache (write-through), then write to disk in the background
+            self._cache_put(conversation_id, conversation_data)
+            with self._lock:
+                self._summaries[conversation_id] = summary
+                already_queued = conversation_id in self._pending
+                self._pending[conversation_id] = payload
+            if not already_queued:
+                self._writer.submit(self._write_conversation, conversation_id)
             
             # Update last conversation tracking
             self._last_conversation_id = conversation_id
-            # Extract the last model used from messages or metadata
-            last_full_name = None
-            if model_metadata and "models_used" in model_metadata:
-                last_full_name = model_metadata["models_used"][-1] if model_metadata["models_used"] else None
-            else:
-                # Try to extract from the last assistant message
-                for msg in reversed(messages):
-                    if msg.get("role") == "assistant":
-                        metadata = msg.get("metadata", {})
-                        if "model" in metadata:
-                            last_full_name = metadata["model"]
-                            break
             
             # Convert to short name for agent interface
-            if last_full_name:
-                short_name = get_short_name(last_full_name)
-                self._last_model_used = short_name if short_name else last_full_name
-            else:
-                self._last_model_used = None
+            self._last_model_used = _model_display_name(last_full_name) if last_full_name else None
             
-            logger.debug(f"Saved conversation {conversation_id} with {len(messages)} messages")
+            logger.debug(f"Queued save of conversation {conversation_id} with {len(messages)} messages")
             return True
             
         except Exception as e:
@@ -123,24 +170,27 @@ class ConversationStorage:
             Conversation data dict or None if not found
         """
         # Check cache first
-        if conversation_id in self._cache:
-            data = self._cache[conversation_id]
+        with self._lock:
+            data = self._cache.get(conversation_id)
+            if data is not None:
+                self._cache.move_to_end(conversation_id)
+        if data is not None:
             logger.debug(f"Loaded conversation {conversation_id} from cache with {len(data.get('messages', []))} messages")
             return data
         
-        # Not in cache, try loading from disk
+        # Not in cache, try loading from disk once queued writes have landed
         try:
+            self._wait_for_writes()
             file_path = self.storage_dir / f"{conversation_id}.json"
             
             if not file_path.exists():
                 logger.debug(f"Conversation {conversation_id} not found")
                 return None
             
-            with open(file_path, "r") as f:
-                data = json.load(f)
+            data = orjson.loads(file_path.read_bytes())
             
             # Add to cache for future access
-            self._cache[conversation_id] = data
+            self._cache_put(conversation_id, data)
             
             logger.debug(f"Loaded conversation {conversation_id} from disk with {len(data.get('messages', []))} messages")
             return data
@@ -149,6 +199,160 @@ class ConversationStorage:
             logger.error(f"Failed to load conversation {conversation_id}: {e}")
             return None
     
+    def close(self):
+        """Wait for queued conversation writes to reach disk."""
+        self._writer.shutdown(wait=True)
+    
+    def _wait_for_writes(self):
+        """Block until every write queued so far has reached disk."""
+        # The writer runs jobs in order, so a no-op finishing means the earlier ones have
+        self._writer.submit(lambda: None).result()
+    
+    def _cache_put(self, conversation_id: str, data: dict):
+        """Cache a conversation, evicting the least recently used one if full."""
+        with self._lock:
+            self._cache[conversation_id] = data
+            self._cache.move_to_end(conversation_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+    
+    def _write_conversation(self, conversation_id: str):
+        """Write the latest pending save of a conversation and its sidecar (writer thread)."""
+        try:
+            file_path = self.storage_dir / f"{conversation_id}.json"
+            
+            with self._lock:
+                conversation_bytes, summary_bytes = self._pending.pop(conversation_id)
+            
+            # Write both temp files first, then swap them in with the directory mtime
+            # read right before and after the renames, so our own change can be told
+            # apart from another process's and patched into the index
+            conversation_tmp = self._write_temp(file_path, conversation_bytes)
+            summary_path = self._summary_path(conversation_id)
+            summary_tmp = self._write_temp(summary_path, summary_bytes)
+            
+            dir_mtime_before = self.storage_dir.stat().st_mtime_ns
+            os.replace(conversation_tmp, file_path)
+            os.replace(summary_tmp, summary_path)
+            dir_mtime_after = self.storage_dir.stat().st_mtime_ns
+            file_mtime = file_path.stat().st_mtime
+            
+            with self._lock:
+                # If the directory had already moved on, leave the index stale so the
+                # next listing rescans and picks up the other change too
+                if self._index is not None and dir_mtime_before == self._index_dir_mtime:
+                    self._index[conversation_id] = file_mtime
+                    self._index_dir_mtime = dir_mtime_after
+            
+            logger.debug(f"Saved conversation {conversation_id}")
+            
+        except Exception as e:
+            logger.error(f"Failed to save conversation {conversation_id}: {e}")
+    
+    def _extract_last_model(self, data: dict) -> Optional[str]:
+        """
+        Find the full name of the last model used in a conversation.
+        
+        Uses the stored last_assistant_model field when present; otherwise
+        derives it from model metadata or the last assistant message and
+        stores it back into data so later calls on the same dict are O(1).
+        
+        Args:
+            data: Conversation data dict
+        
+        Returns:
+            Full model name or None if no model is recorded
+        """
+        if "last_assistant_model" in data:
+            return data["last_assistant_model"]
+        
+        last_full_name = None
+        model_metadata = data.get("model_metadata")
+        if model_metadata and "models_used" in model_metadata:
+            models = model_metadata["models_used"]
+            last_full_name = models[-1] if models else None
+        else:
+            # Try to extract from the last assistant message
+            for msg in reversed(data.get("messages", [])):
+                if msg.get("role") == "assistant":
+                    metadata = msg.get("metadata", {})
+                    if "model" in metadata:
+                        last_full_name = metadata["model"]
+                        break
+        
+        data["last_assistant_model"] = last_full_name
+        return last_full_name
+    
+    def _summary_path(self, conversation_id: str) -> Path:
+        """Path of the listing summary sidecar for a conversation."""
+        return self.storage_dir / f"{conversation_id}{SUMMARY_SUFFIX}"
+    
+    def _write_temp(self, file_path: Path, data: bytes) -> Path:
+        """Write serialized JSON to a temp file, to be swapped in over file_path with os.replace.
+        
+        Renaming a complete temp file over the target means readers never see a partial file.
+        """
+        tmp_path = self._tmp_dir / (file_path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        return tmp_path
+    
+    def _load_summary(self, conversation_id: str) -> dict:
+        """
+        Load the listing fields for a conversation.
+        
+        Uses the summary recorded when this process saved the conversation,
+        otherwise reads the summary sidecar, falling back to the full
+        conversation file for conversations saved before sidecars existed.
+        
+        Args:
+            conversation_id: Unique conversation identifier
+        
+        Returns:
+            Dict with id, title, created, updated and model (full name or None)
+        """
+        summary = self._summaries.get(conversation_id)
+        if summary is not None:
+            return summary
+        
+        summary_path = self._summary_path(conversation_id)
+        if summary_path.exists():
+            return orjson.loads(summary_path.read_bytes())
+        
+        data = orjson.loads((self.storage_dir / f"{conversation_id}.json").read_bytes())
+        return {
+            "id": data.get("id"),
+            "title": data.get("title"),
+            "created": data.get("created"),
+            "updated": data.get("updated"),
+            "model": self._extract_last_model(data),
+        }
+    
+    def _index_is_current(self) -> bool:
+        """Check whether the listing index still matches the storage directory."""
+        return (
+            self._index is not None
+            and self.storage_dir.stat().st_mtime_ns == self._index_dir_mtime
+        )
+    
+    def _rebuild_index(self):
+        """Scan the storage directory for conversation files and their mtimes."""
+        # Read the directory mtime first so changes during the scan force another rebuild
+        dir_mtime = self.storage_dir.stat().st_mtime_ns
+        index = {}
+        with os.scandir(self.storage_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    index[name[:-5]] = entry.stat().st_mtime
+                except Exception as e:
+                    logger.warning(f"Failed to stat file {entry.path}: {e}")
+                    continue
+        
+        self._index = index
+        self._index_dir_mtime = dir_mtime
+    
     def get_last_conversation_info(self) -> tuple[Optional[str], Optional[str]]:
         """
         Get the last conversation ID and model used.
@@ -170,36 +374,29 @@ class ConversationStorage:
         Returns:
             Clean list of messages for API
         """
-        clean_messages = []
-        
-        for msg in messages:
-            # Only include role and content for API
-            clean_msg = {
-                "role": msg.get("role"),
-                "content": msg.get("content")
-            }
-            clean_messages.append(clean_msg)
-        
-        return clean_messages
+        # Only include role and content for API
+        # .get() so a hand-edited or partial message can't make a conversation unusable
+        return [{"role": msg.get("role"), "content": msg.get("content")} for msg in messages]
     
-    def add_metadata_to_message(self, message: dict, metadata: dict) -> dict:
+    def add_metadata_to_message(self, message: dict, metadata: dict,
+                                timestamp: Optional[str] = None) -> dict:
         """
         Add metadata to a message for storage.
         
         Args:
             message: Basic message dict with role and content
             metadata: Metadata to add (timestamp, model, etc.)
+            timestamp: ISO timestamp to record, so callers can share one (default: now)
         
         Returns:
             Message with metadata added
         """
-        return {
-            **message,
-            "metadata": {
-                "timestamp": datetime.utcnow().isoformat(),
-                **metadata
-            }
-        }
+        message_metadata = {"timestamp": timestamp or datetime.utcnow().isoformat()}
+        message_metadata.update(metadata)
+        
+        stored_message = dict(message)
+        stored_message["metadata"] = message_metadata
+        return stored_message
     
     def list_recent_conversations(self, limit: int = 20) -> list[dict]:
         """
@@ -214,70 +411,54 @@ class ConversationStorage:
         conversations = []
         
         try:
-            # Get all conversation files with their modification times
-            files_with_mtime = []
-            for file_path in self.storage_dir.glob("*.json"):
-                try:
-                    mtime = file_path.stat().st_mtime
-                    files_with_mtime.append((mtime, file_path))
-                except Exception as e:
-                    logger.warning(f"Failed to stat file {file_path}: {e}")
-                    continue
+            # Listings read from disk, so let our own queued saves land first
+            self._wait_for_writes()
             
-            # Sort by modification time (newest first) and take only the limit
-            files_with_mtime.sort(key=lambda x: x[0], reverse=True)
-            recent_files = files_with_mtime[:limit]
+            with self._lock:
+                # Conversation modification times, rescanned only if the directory changed
+                if not self._index_is_current():
+                    self._rebuild_index()
+                
+                if not self._index:
+                    return []
+                
+                # Take the newest conversations by modification time without sorting them
+                # all; when there are no more than limit, every one is listed anyway
+                if len(self._index) <= limit:
+                    recent_ids = list(self._index)
+                else:
+                    recent_ids = heapq.nlargest(limit, self._index, key=self._index.get)
             
             # Now load only the recent files
-            for _, file_path in recent_files:
+            for conversation_id in recent_ids:
                 try:
-                    with open(file_path, "r") as f:
-                        data = json.load(f)
-                        
-                        # Extract key information
-                        conv_summary = {
-                            "id": data.get("id"),
-                            "title": data.get("title"),
-                            "created": data.get("created"),
-                            "updated": data.get("updated"),
-                        }
-                        
-                        # Extract model used from messages or metadata
-                        model_full_name = None
-                        if "model_metadata" in data and "models_used" in data["model_metadata"]:
-                            models = data["model_metadata"]["models_used"]
-                            model_full_name = models[-1] if models else None
-                        else:
-                            # Try to extract from the last assistant message
-                            for msg in reversed(data.get("messages", [])):
-                                if msg.get("role") == "assistant":
-                                    metadata = msg.get("metadata", {})
-                                    if "model" in metadata:
-                                        model_full_name = metadata["model"]
-                                        break
-                        
-                        # Convert to short name for agent interface
-                        if model_full_name:
-                            short_name = get_short_name(model_full_name)
-                            model_used = short_name if short_name else model_full_name
-                        else:
-                            model_used = None
-                        
-                        conv_summary["model_used"] = model_used
-                        
-                        # If no title exists (should not happen with new version)
-                        # just use a placeholder
-                        if not conv_summary["title"]:
-                            conv_summary["title"] = "[Untitled conversation]"
-                        
-                        conversations.append(conv_summary)
-                        
+                    summary = self._load_summary(conversation_id)
+                    
+                    # Extract key information
+                    conv_summary = {
+                        "id": summary.get("id"),
+                        "title": summary.get("title"),
+                        "created": summary.get("created"),
+                        "updated": summary.get("updated"),
+                    }
+                    model_full_name = summary.get("model")
+                    
+                    # Convert to short name for agent interface
+                    conv_summary["model_used"] = _model_display_name(model_full_name) if model_full_name else None
+                    
+                    # If no title exists (should not happen with new version)
+                    # just use a placeholder
+                    if not conv_summary["title"]:
+                        conv_summary["title"] = "[Untitled conversation]"
+                    
+                    conversations.append(conv_summary)
+                    
                 except Exception as e:
-                    logger.warning(f"Failed to read conversation file {file_path}: {e}")
+                    logger.warning(f"Failed to read conversation {conversation_id}: {e}")
                     continue
             
-            # The files are already in order from the filesystem sorting
-            # But we should still sort by the actual "updated" field in case of discrepancies
+            # The files are already in mtime order, but sort the (at most limit)
+            # results by the actual "updated" field in case of discrepancies
             conversations.sort(key=lambda x: x.get("updated", ""), reverse=True)
             
             return conversations